@@ -19,6 +19,7 @@ Environment variables:
     IMSG_BRIDGE_PORT      Listen port (default: 8788)
     IMSG_PATH             Path to imsg binary (default: /opt/homebrew/bin/imsg)
     IMSG_DB_PATH          Path to chat.db (optional, passed to imsg)
+    IMSG_BRIDGE_THREADS   Max concurrent HTTP connections (default: 16)
 
 Contacts file format (JSON):
     {
@@ -30,18 +31,36 @@ Endpoints:
     GET  /health          — Health check (no auth)
     POST /rpc             — Forward a JSON-RPC request to imsg, return response
     GET  /notifications   — Return buffered inbound notifications, clear buffer
+                            (?wait=N holds the request up to N s until one arrives)
     GET  /contacts        — List available contact aliases (no real handles exposed)
 """
 
+import collections
+import fcntl
+import functools
+import hmac
 import http.server
+import itertools
 import json
 import os
+import re
+import select
+import selectors
 import signal
+import socket
 import subprocess
 import sys
 import threading
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime, timezone
-from urllib.parse import urlparse
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
 
 # ── Config ──────────────────────────────────────────────────────────────
 
@@ -50,33 +69,85 @@ BRIDGE_HOST = os.environ.get("IMSG_BRIDGE_HOST", "0.0.0.0")
 BRIDGE_PORT = int(os.environ.get("IMSG_BRIDGE_PORT", "8788"))
 IMSG_PATH = os.environ.get("IMSG_PATH", "/opt/homebrew/bin/imsg")
 IMSG_DB_PATH = os.environ.get("IMSG_DB_PATH", "")
+BRIDGE_THREADS = int(os.environ.get("IMSG_BRIDGE_THREADS", "16"))
 
 # Max notifications to buffer before dropping oldest
 NOTIFICATION_BUFFER_MAX = 500
 # Timeout waiting for an RPC response (seconds)
 RPC_TIMEOUT = 15
+# Longest a /notifications?wait=N long-poll is held open (seconds)
+NOTIFICATION_WAIT_MAX = 30
+# Max bytes consumed from imsg stdout per reader wake-up
+READ_CHUNK_SIZE = 65536
+# Max accepted POST body size (bytes)
+MAX_BODY_BYTES = 2 * 1024 * 1024
+# Idle keep-alive connections are closed after this long (seconds), since
+# each open connection occupies a worker thread
+KEEPALIVE_TIMEOUT = 30
+# Requested kernel buffer for the pipes to/from imsg, so bursts in either
+# direction don't stall the writer (Linux only; else the OS default stays)
+PIPE_BUFFER_SIZE = 1024 * 1024
 
 if not BRIDGE_TOKEN:
     print("ERROR: IMSG_BRIDGE_TOKEN is required", file=sys.stderr)
     sys.exit(1)
 
+# Precomputed for the constant-time Authorization check
+_TOKEN_BYTES = BRIDGE_TOKEN.encode()
+_AUTH_PREFIX = b"Bearer "
+
+if orjson is not None:
+    def json_dumpb(obj) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson can't encode ints beyond 64 bits or nesting past 254
+            # levels, both of which the stdlib fallback below can produce
+            return json.dumps(obj).encode()
+
+    def json_loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input the stdlib accepts (1e400, NaN,
+            # a UTF-8 BOM); keep accepting what the stdlib parser did
+            return json.loads(data)
+else:
+    json_loads = json.loads
+
+    def json_dumpb(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 # ── Contacts ────────────────────────────────────────────────────────────
 
 # alias -> real handle (phone/email)
 CONTACTS = {}
 # real handle (normalized) -> alias (reverse lookup)
 HANDLE_TO_ALIAS = {}
+# alias list served by /health and /contacts, built once per load
+CONTACT_ALIASES = []
+
+# Service prefixes stripped by normalize_handle, in the order they're peeled
+_PREFIX_RE = re.compile(r"(?:imessage:)?(?:sms:)?(?:tel:)?")
+# str.translate table deleting every ASCII non-digit
+_ASCII_NON_DIGITS = str.maketrans("", "", "".join(
+    chr(c) for c in range(128) if not chr(c).isdigit()))
 
 
+@functools.lru_cache(maxsize=4096)
 def normalize_handle(handle: str) -> str:
-    """Normalize a phone number or email for comparison."""
+    """Normalize a phone number or email for comparison (memoized)."""
+    # Fast path: already-normalized "+<digits>" (10 digits still get the
+    # country code prepended below)
+    if handle[:1] == "+" and handle[1:].isdigit() and len(handle) != 11:
+        return handle
     h = handle.strip().lower()
-    for prefix in ("imessage:", "sms:", "tel:"):
-        if h.startswith(prefix):
-            h = h[len(prefix):]
-    h = h.strip()
+    h = h[_PREFIX_RE.match(h).end():].strip()
     if h.startswith("+") or (h and h[0].isdigit()) or h.startswith("("):
-        digits = "".join(c for c in h if c.isdigit())
+        digits = h.translate(_ASCII_NON_DIGITS)
+        if digits and not digits.isdigit():
+            # Rare non-ASCII leftovers: fall back to the per-character filter
+            digits = "".join(c for c in digits if c.isdigit())
         if len(digits) == 10:
             digits = "1" + digits
         if digits:
@@ -86,7 +157,7 @@ def normalize_handle(handle: str) -> str:
 
 def load_contacts():
     """Load contacts from file or env var."""
-    global CONTACTS, HANDLE_TO_ALIAS
+    global CONTACTS, HANDLE_TO_ALIAS, CONTACT_ALIASES
 
     raw = None
     contacts_file = os.environ.get("IMSG_CONTACTS_FILE", "")
@@ -115,6 +186,7 @@ def load_contacts():
               file=sys.stderr)
         sys.exit(1)
 
+    normalize_handle.cache_clear()
     CONTACTS = {}
     HANDLE_TO_ALIAS = {}
     for alias, handle in raw.items():
@@ -128,13 +200,16 @@ def load_contacts():
     if not CONTACTS:
         print("ERROR: Contacts file is empty", file=sys.stderr)
         sys.exit(1)
+    CONTACT_ALIASES = list(CONTACTS.keys())
 
     log(f"Loaded {len(CONTACTS)} contact(s): {', '.join(CONTACTS.keys())}")
 
 
 def resolve_alias(alias: str):
     """Resolve an alias to a real handle. Returns None if not found."""
-    return CONTACTS.get(alias.strip().lower())
+    # Aliases are stored lowercased; clients usually send them that way,
+    # so try the input as-is before allocating a normalized copy
+    return CONTACTS.get(alias) or CONTACTS.get(alias.strip().lower())
 
 
 def resolve_handle(handle: str):
@@ -149,6 +224,11 @@ def is_known_handle(handle: str) -> bool:
 
 # ── Security filtering ──────────────────────────────────────────────────
 
+# Notification methods that carry messages and get filtered/rewritten
+NOTIFICATION_METHODS = frozenset({"message", "new_message", "message_received"})
+# Keys that may carry the sender's handle, in lookup priority order
+SENDER_KEYS = ("sender", "handle", "from", "address")
+
 
 def filter_send_request(params: dict):
     """
@@ -181,6 +261,23 @@ def filter_send_request(params: dict):
     return False, params
 
 
+def _extract_sender(obj: dict) -> str:
+    """Return the first non-blank sender value in obj, stripped, or ""."""
+    # Fast path: imsg puts the handle under "sender"
+    val = obj.get("sender")
+    if isinstance(val, str):
+        val = val.strip()
+        if val:
+            return val
+    for key in SENDER_KEYS[1:]:
+        val = obj.get(key)
+        if isinstance(val, str):
+            val = val.strip()
+            if val:
+                return val
+    return ""
+
+
 def rewrite_notification(params: dict):
     """
     Filter and rewrite an inbound notification.
@@ -196,22 +293,8 @@ def rewrite_notification(params: dict):
         if from_me is True or from_me == 1 or from_me == "true" or from_me == "1":
             return None
 
-    # Find sender
-    sender = ""
-    for key in ("sender", "handle", "from", "address"):
-        val = msg.get(key, "")
-        if isinstance(val, str) and val.strip():
-            sender = val.strip()
-            break
-
-    if not sender:
-        # Check top-level params too
-        for key in ("sender", "handle", "from", "address"):
-            val = params.get(key, "")
-            if isinstance(val, str) and val.strip():
-                sender = val.strip()
-                break
-
+    # Find sender (falling back to top-level params)
+    sender = _extract_sender(msg) or _extract_sender(params)
     if not sender:
         return None
 
@@ -221,20 +304,26 @@ def rewrite_notification(params: dict):
         log(f"DROPPED notification from {sender}: not in contacts")
         return None
 
-    # Rewrite: replace real handle with alias in the notification
-    rewritten = json.loads(json.dumps(params))  # deep copy
+    # Rewrite: replace real handle with alias in the notification.
+    # Only the sender keys are touched, so shallow copies of the dicts we
+    # actually mutate are enough — and if nothing changes, no copy at all.
+    msg_keys = [k for k in SENDER_KEYS if k in msg and msg[k] != alias]
+    top_keys = [k for k in SENDER_KEYS if k in params and params[k] != alias]
+    if not msg_keys and not top_keys:
+        return params
+
+    rewritten = params.copy()
 
     # Rewrite message-level sender fields
-    rewritten_msg = rewritten.get("message", {})
-    if isinstance(rewritten_msg, dict):
-        for key in ("sender", "handle", "from", "address"):
-            if key in rewritten_msg:
-                rewritten_msg[key] = alias
+    if msg_keys:
+        rewritten_msg = msg.copy()
+        rewritten["message"] = rewritten_msg
+        for key in msg_keys:
+            rewritten_msg[key] = alias
 
     # Rewrite top-level sender fields
-    for key in ("sender", "handle", "from", "address"):
-        if key in rewritten:
-            rewritten[key] = alias
+    for key in top_keys:
+        rewritten[key] = alias
 
     return rewritten
 
@@ -242,13 +331,64 @@ def rewrite_notification(params: dict):
 # ── Logging ─────────────────────────────────────────────────────────────
 
 
+# strftime format -> (epoch second, formatted UTC timestamp)
+_TS_CACHE = {}
+
+
+def _timestamp(fmt: str) -> str:
+    """Current UTC time in `fmt`, re-formatted at most once per second."""
+    now = int(time.time())
+    cached = _TS_CACHE.get(fmt)
+    if cached is None or cached[0] != now:
+        cached = (now, datetime.fromtimestamp(now, timezone.utc).strftime(fmt))
+        _TS_CACHE[fmt] = cached
+    return cached[1]
+
+
 def log(msg: str):
-    ts = datetime.now(timezone.utc).strftime("%H:%M:%S")
+    ts = _timestamp("%H:%M:%S")
     print(f"[bridge {ts}] {msg}", file=sys.stderr, flush=True)
 
 
 # ── imsg rpc manager ───────────────────────────────────────────────────
 
+# fcntl command for resizing a pipe; Linux-only (Python exposes it on 3.10+)
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ",
+                        1031 if sys.platform.startswith("linux") else None)
+
+
+def grow_pipe(fd: int):
+    """Best-effort resize of a pipe's kernel buffer to PIPE_BUFFER_SIZE."""
+    if _F_SETPIPE_SZ is None:
+        return
+    try:
+        fcntl.fcntl(fd, _F_SETPIPE_SZ, PIPE_BUFFER_SIZE)
+    except OSError:
+        pass  # e.g. above /proc/sys/fs/pipe-max-size; the default still works
+
+
+def take_lines(buf: bytearray, chunk: bytes) -> list:
+    """Append chunk to buf, then remove and return the complete lines in it.
+
+    Only the new chunk is searched for a newline, so a long line arriving
+    over many reads costs linear rather than quadratic time.
+    """
+    buf += chunk
+    if b"\n" not in chunk:
+        return []
+    end = buf.rindex(b"\n")
+    with memoryview(buf) as view:
+        lines = bytes(view[:end]).split(b"\n")
+    del buf[:end + 1]
+    return lines
+
+
+# Constant JSON-RPC error objects, shared by every error response
+# (only serialized, never mutated)
+_NOT_RUNNING_ERR = {"code": -32000, "message": "imsg rpc not running"}
+_BLOCKED_ERR = {"code": -32001,
+                "message": "Blocked by iMessage bridge: recipient not in contacts"}
+
 
 class ImsgRpcManager:
     """Manages the imsg rpc subprocess and routes JSON-RPC traffic."""
@@ -256,12 +396,22 @@ class ImsgRpcManager:
     def __init__(self):
         self.proc = None
         self.stdin_lock = threading.Lock()
+        # Requests are sent to imsg under our own integer ids so that ids
+        # chosen by different clients can never collide; the caller's id is
+        # restored on the response.
+        self._next_id = itertools.count(1)
+        # Wire id -> Future for the response. Single-key dict operations are
+        # atomic under the GIL, and each entry is popped exactly once, so no
+        # lock is needed.
         self.pending = {}
-        self.pending_lock = threading.Lock()
-        self.notifications = []
+        self.notifications = collections.deque(maxlen=NOTIFICATION_BUFFER_MAX)
         self.notifications_lock = threading.Lock()
+        # Signalled on every append, for long-polling drains
+        self.notifications_added = threading.Condition(self.notifications_lock)
         self.reader_thread = None
         self.running = False
+        # Self-pipe used by stop() to wake the stdout reader
+        self._wake_r, self._wake_w = os.pipe()
 
     def start(self):
         args = [IMSG_PATH, "rpc"]
@@ -274,12 +424,12 @@ class ImsgRpcManager:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=sys.stderr,
-                text=True,
-                bufsize=1
             )
         except FileNotFoundError:
             log(f"ERROR: imsg not found at {IMSG_PATH}")
             sys.exit(1)
+        grow_pipe(self.proc.stdin.fileno())
+        grow_pipe(self.proc.stdout.fileno())
 
         self.running = True
         self.reader_thread = threading.Thread(target=self._read_stdout, daemon=True)
@@ -308,6 +458,7 @@ class ImsgRpcManager:
 
     def stop(self):
         self.running = False
+        os.write(self._wake_w, b"x")
         if self.proc:
             try:
                 self.proc.terminate()
@@ -318,59 +469,108 @@ class ImsgRpcManager:
 
     def _read_stdout(self):
         """Read from imsg stdout, route responses and buffer notifications."""
+        # Wait on stdout and the wake pipe together so stop() can interrupt
+        # the reader; each wake-up consumes everything available at once.
+        fd = self.proc.stdout.fileno()
+        sel = selectors.DefaultSelector()
+        sel.register(fd, selectors.EVENT_READ)
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        pending_bytes = bytearray()
         try:
-            for line in self.proc.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    msg = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                msg_id = msg.get("id")
-
-                # Response to a request
-                if msg_id is not None:
-                    key = str(msg_id)
-                    with self.pending_lock:
-                        if key in self.pending:
-                            entry = self.pending[key]
-                            entry["result"] = msg
-                            entry["event"].set()
-                            continue
-
-                # Notification — filter and rewrite
-                method = msg.get("method", "")
-                params = msg.get("params", {})
-
-                if method in ("message", "new_message", "message_received"):
-                    rewritten = rewrite_notification(params)
-                    if rewritten is None:
-                        continue
-                    # Store the rewritten notification
-                    rewritten_msg = dict(msg)
-                    rewritten_msg["params"] = rewritten
-                    with self.notifications_lock:
-                        self.notifications.append(json.dumps(rewritten_msg))
-                        if len(self.notifications) > NOTIFICATION_BUFFER_MAX:
-                            self.notifications = self.notifications[-NOTIFICATION_BUFFER_MAX:]
-                else:
-                    # Non-message notifications pass through
-                    with self.notifications_lock:
-                        self.notifications.append(json.dumps(msg))
-                        if len(self.notifications) > NOTIFICATION_BUFFER_MAX:
-                            self.notifications = self.notifications[-NOTIFICATION_BUFFER_MAX:]
+            while self.running:
+                ready = sel.select()
+                if any(key.fd == self._wake_r for key, _ in ready):
+                    break
+                chunk = os.read(fd, READ_CHUNK_SIZE)
+                if not chunk:
+                    # imsg exited: flush any unterminated last line
+                    self._handle_line(bytes(pending_bytes))
+                    break
+                for line in take_lines(pending_bytes, chunk):
+                    self._handle_line(line)
 
         except Exception as e:
             if self.running:
                 log(f"stdout reader error: {e}")
+        finally:
+            sel.close()
+
+    def _handle_line(self, line: bytes):
+        """Route one line from imsg: a response or a notification."""
+        line = line.strip()
+        if not line:
+            return
+        # Only a line the strict parser accepted is valid JSON as-is and
+        # may be spliced into /notifications verbatim; the stdlib also
+        # takes NaN, 1e400 and a leading UTF-8 BOM
+        try:
+            if orjson is not None:
+                try:
+                    msg = orjson.loads(line)
+                    verbatim = True
+                except orjson.JSONDecodeError:
+                    msg = json.loads(line)
+                    verbatim = False
+            else:
+                msg = json.loads(line)
+                # json.dumps would write NaN back out anyway; only the BOM
+                # is worse verbatim than re-encoded
+                verbatim = not line.startswith(b"\xef\xbb\xbf")
+        except ValueError:  # JSONDecodeError or bad UTF-8
+            return
+
+        msg_id = msg.get("id")
+
+        # Response to a request
+        if msg_id is not None:
+            future = self.pending.pop(msg_id, None) if isinstance(msg_id, int) else None
+            if future is not None:
+                future.set_result(msg)
+            else:
+                # Late (the caller timed out) or unknown: its id is an
+                # internal wire id, meaningless to clients, so never buffer it
+                log(f"Dropped response with no pending request (id {msg_id!r})")
+            return
+
+        # Notification — filter and rewrite
+        method = msg.get("method", "")
+        params = msg.get("params", {})
+
+        if isinstance(method, str) and method in NOTIFICATION_METHODS:
+            rewritten = rewrite_notification(params)
+            if rewritten is None:
+                return
+            # Store the rewritten notification, encoded
+            rewritten_msg = dict(msg)
+            rewritten_msg["params"] = rewritten
+            encoded = json_dumpb(rewritten_msg)
+            with self.notifications_added:
+                self.notifications.append(encoded)
+                self.notifications_added.notify_all()
+        else:
+            # Non-message notifications pass through verbatim when the
+            # line is already valid JSON, saving a re-encode
+            encoded = line if verbatim else json_dumpb(msg)
+            with self.notifications_added:
+                self.notifications.append(encoded)
+                self.notifications_added.notify_all()
+
+    def _write_request(self, request: dict):
+        """Write one JSON-RPC line to imsg stdin."""
+        # Payload and newline are written separately so the (possibly
+        # large) encoded request isn't copied again just to append b"\n";
+        # the buffered pipe coalesces them into one write on flush
+        data = json_dumpb(request)
+        with self.stdin_lock:
+            self.proc.stdin.write(data)
+            self.proc.stdin.write(b"\n")
+            self.proc.stdin.flush()
 
     def send_request(self, request: dict, timeout: float = RPC_TIMEOUT) -> dict:
         """Send a JSON-RPC request and wait for the response."""
         if not self.proc or not self.proc.stdin:
             return {"jsonrpc": "2.0", "id": request.get("id"),
-                    "error": {"code": -32000, "message": "imsg rpc not running"}}
+                    "error": _NOT_RUNNING_ERR}
 
         req_id = request.get("id")
         method = request.get("method", "")
@@ -378,54 +578,54 @@ class ImsgRpcManager:
 
         # No id = notification from client, just forward
         if req_id is None:
-            with self.stdin_lock:
-                self.proc.stdin.write(json.dumps(request) + "\n")
-                self.proc.stdin.flush()
+            self._write_request(request)
             return {}
 
         # Security: validate and transform send requests
         if method == "send":
             allowed, modified_params = filter_send_request(params)
             if not allowed:
-                return {
-                    "jsonrpc": "2.0", "id": req_id,
-                    "error": {"code": -32001,
-                               "message": "Blocked by iMessage bridge: recipient not in contacts"}
-                }
+                return {"jsonrpc": "2.0", "id": req_id, "error": _BLOCKED_ERR}
             # Use modified params (alias resolved to real handle)
             request = dict(request)
             request["params"] = modified_params
 
-        # Register pending response
-        key = str(req_id)
-        event = threading.Event()
-        entry = {"event": event, "result": None}
-
-        with self.pending_lock:
-            self.pending[key] = entry
+        # Register pending response under a fresh wire id
+        key = next(self._next_id)
+        request = dict(request)
+        request["id"] = key
+        future = Future()
+        self.pending[key] = future
 
         try:
-            with self.stdin_lock:
-                self.proc.stdin.write(json.dumps(request) + "\n")
-                self.proc.stdin.flush()
+            self._write_request(request)
 
-            if event.wait(timeout=timeout):
-                return entry["result"]
-            else:
+            try:
+                response = future.result(timeout=timeout)
+            except FutureTimeout:
                 return {
                     "jsonrpc": "2.0", "id": req_id,
                     "error": {"code": -32000, "message": f"Timeout ({timeout}s)"}
                 }
+            result = dict(response)
+            result["id"] = req_id
+            return result
         finally:
-            with self.pending_lock:
-                self.pending.pop(key, None)
+            self.pending.pop(key, None)
+
+    def wait_for_notifications(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the buffer to be non-empty."""
+        with self.notifications_added:
+            return bool(self.notifications_added.wait_for(
+                lambda: self.notifications, timeout))
 
     def drain_notifications(self) -> list:
-        """Return and clear buffered notifications."""
+        """Return and clear buffered notifications (as encoded JSON objects)."""
+        # Swap in a fresh buffer so the lock is held for O(1), not O(N)
+        fresh = collections.deque(maxlen=NOTIFICATION_BUFFER_MAX)
         with self.notifications_lock:
-            result = self.notifications[:]
-            self.notifications.clear()
-        return result
+            result, self.notifications = self.notifications, fresh
+        return list(result)
 
     @property
     def is_alive(self) -> bool:
@@ -437,81 +637,203 @@ class ImsgRpcManager:
 rpc_manager = ImsgRpcManager()
 
 
+class BridgeServer(http.server.HTTPServer):
+    """HTTP server that handles requests on a bounded worker pool, so a slow
+    /rpc call doesn't stall /health or /notifications."""
+
+    def __init__(self, *args, max_workers: int = BRIDGE_THREADS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="bridge-http")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        # Mirrors socketserver.ThreadingMixIn.process_request_thread
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
 class BridgeHandler(http.server.BaseHTTPRequestHandler):
 
+    # Keep-alive lets the proxy reuse one connection across polls and RPCs;
+    # every response carries a Content-Length, as HTTP/1.1 requires
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # Responses go out as two writes (status line, then headers + body);
+    # with Nagle on, a reused connection stalls ~40ms on the delayed ACK
+    disable_nagle_algorithm = True
+
+    _JSON_HEADERS = b"Content-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+
     def log_message(self, format, *args):
-        ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        ts = _timestamp("%Y-%m-%d %H:%M:%S")
         sys.stderr.write(f"[{ts}] {args[0]}\n")
 
+    def log_error(self, format, *args):
+        # An idle keep-alive connection timing out is routine, not an error
+        if args and isinstance(args[0], socket.timeout):
+            return
+        self.log_message(format, *args)
+
     def _send_json(self, status: int, data):
-        body = json.dumps(data).encode()
+        self._send_body(status, json_dumpb(data))
+
+    def _send_body(self, status: int, body: bytes):
+        """Send an already-encoded JSON body."""
+        # send_response logs and emits the status line + Server/Date; our
+        # two headers and the body then go out as one preformatted write
         self.send_response(status)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        if self.close_connection:
+            # Tell keep-alive clients not to reuse this connection
+            self.send_header("Connection", "close")
+        self.flush_headers()
+        self.wfile.write(self._JSON_HEADERS % len(body) + body)
+
+    def _body_length(self):
+        """Declared request body size, or None if the header is invalid."""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            return None
+        return length if length >= 0 else None
 
-    def _read_body(self) -> dict:
-        length = int(self.headers.get("Content-Length", 0))
+    def _read_body(self, length: int) -> dict:
         if length == 0:
             return {}
-        return json.loads(self.rfile.read(length))
+        return json_loads(self.rfile.read(length))
 
     def _check_auth(self) -> bool:
-        auth = self.headers.get("Authorization", "")
-        return auth.startswith("Bearer ") and auth[7:].strip() == BRIDGE_TOKEN
+        # Header values are decoded as latin-1; encoding back recovers the
+        # raw bytes the client sent
+        auth = self.headers.get("Authorization", "").encode("latin-1")
+        token = auth[7:].strip() if auth.startswith(_AUTH_PREFIX) else b""
+        return hmac.compare_digest(token, _TOKEN_BYTES)
+
+    def _peer_closed(self) -> bool:
+        """Whether the client has closed its end of the connection."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            # Readable with nothing to peek at means EOF; pipelined request
+            # bytes would show up as data instead
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def _path(self) -> str:
+        """Request path without query string or trailing slash."""
+        # Cheaper than urlparse for the handful of fixed routes we serve
+        path = self.path
+        q = path.find("?")
+        if q >= 0:
+            path = path[:q]
+        return path.rstrip("/")
+
+    def _get_health(self):
+        self._send_json(200, {
+            "status": "ok",
+            "imsg_alive": rpc_manager.is_alive,
+            "contacts": CONTACT_ALIASES,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+
+    def _get_notifications(self):
+        wait = 0.0
+        q = self.path.find("?")
+        if q >= 0:
+            try:
+                wait = float(urllib.parse.parse_qs(self.path[q + 1:]).get("wait", ["0"])[0])
+            except ValueError:
+                wait = -1.0
+            if not 0 <= wait < float("inf"):
+                self._send_json(400, {"error": "Invalid wait"})
+                return
+        if wait > 0:
+            rpc_manager.wait_for_notifications(min(wait, NOTIFICATION_WAIT_MAX))
+            if self._peer_closed():
+                # The long-poll was abandoned; leave the buffer for the next
+                # poll instead of draining it into a dead socket
+                self.close_connection = True
+                return
+        # Buffered notifications are already JSON; splice them into the
+        # array rather than decoding and re-encoding each one
+        notifications = rpc_manager.drain_notifications()
+        self._send_body(200, b'{"notifications":[' + b",".join(notifications) + b"]}")
+
+    def _get_contacts(self):
+        self._send_json(200, {
+            "contacts": CONTACT_ALIASES
+        })
+
+    def _post_rpc(self, body: dict):
+        if not rpc_manager.is_alive:
+            self._send_json(503, {"error": "imsg rpc is not running"})
+            return
+        result = rpc_manager.send_request(body)
+        self._send_json(200, result)
+
+    # Authenticated routes (/health is served before the auth check)
+    GET_ROUTES = {
+        "/notifications": _get_notifications,
+        "/contacts": _get_contacts,
+    }
+    POST_ROUTES = {
+        "/rpc": _post_rpc,
+    }
 
     def do_GET(self):
-        path = urlparse(self.path).path.rstrip("/")
+        path = self._path()
 
         if path == "/health":
-            self._send_json(200, {
-                "status": "ok",
-                "imsg_alive": rpc_manager.is_alive,
-                "contacts": list(CONTACTS.keys()),
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
+            self._get_health()
             return
 
         if not self._check_auth():
             self._send_json(401, {"error": "Unauthorized"})
             return
 
-        if path == "/notifications":
-            notifications = rpc_manager.drain_notifications()
-            self._send_json(200, {"notifications": notifications})
-            return
-
-        if path == "/contacts":
-            self._send_json(200, {
-                "contacts": list(CONTACTS.keys())
-            })
+        handler = self.GET_ROUTES.get(path)
+        if handler is None:
+            self._send_json(404, {"error": "Not found"})
             return
-
-        self._send_json(404, {"error": "Not found"})
+        handler(self)
 
     def do_POST(self):
-        path = urlparse(self.path).path.rstrip("/")
+        path = self._path()
 
         if not self._check_auth():
+            # The body is left unread, so the connection can't be reused
+            self.close_connection = True
             self._send_json(401, {"error": "Unauthorized"})
             return
 
+        length = self._body_length()
+        if length is None:
+            self.close_connection = True
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            # Refuse before reading so a bogus length can't exhaust memory
+            self.close_connection = True
+            self._send_json(413, {"error": f"Body exceeds {MAX_BODY_BYTES} bytes"})
+            return
+
         try:
-            body = self._read_body()
-        except json.JSONDecodeError as e:
+            body = self._read_body(length)
+        except ValueError as e:  # JSONDecodeError or bad UTF-8
             self._send_json(400, {"error": f"Invalid JSON: {e}"})
             return
 
-        if path == "/rpc":
-            if not rpc_manager.is_alive:
-                self._send_json(503, {"error": "imsg rpc is not running"})
-                return
-            result = rpc_manager.send_request(body)
-            self._send_json(200, result)
+        handler = self.POST_ROUTES.get(path)
+        if handler is None:
+            self._send_json(404, {"error": "Not found"})
             return
-
-        self._send_json(404, {"error": "Not found"})
+        handler(self, body)
 
 
 # ── Main ────────────────────────────────────────────────────────────────
@@ -521,7 +843,7 @@ def main():
     load_contacts()
     rpc_manager.start()
 
-    server = http.server.HTTPServer((BRIDGE_HOST, BRIDGE_PORT), BridgeHandler)
+    server = BridgeServer((BRIDGE_HOST, BRIDGE_PORT), BridgeHandler)
     log(f"iMessage Bridge listening on {BRIDGE_HOST}:{BRIDGE_PORT}")
 
     def shutdown(signum=None, frame=None):
@@ -24,33 +24,81 @@ Contacts file format:
 See README.md for full documentation.
 """
 
+import fcntl
+import functools
 import json
 import os
+import re
+import selectors
 import signal
 import subprocess
 import sys
-import threading
+import time
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
 # ── Config ──────────────────────────────────────────────────────────────
 
 IMSG_PATH = os.environ.get("IMSG_PATH", "/opt/homebrew/bin/imsg")
+# Max bytes read from either side per wake-up
+READ_CHUNK_SIZE = 65536
+# Stop reading the client while this many bytes are still queued for imsg
+IMSG_BACKLOG_MAX = 1024 * 1024
+# Requested kernel buffer for the pipes to/from imsg, so bursts in either
+# direction don't stall the writer (Linux only; else the OS default stays)
+PIPE_BUFFER_SIZE = 1024 * 1024
+
+if orjson is not None:
+    def json_dumpb(obj) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson can't encode ints beyond 64 bits or nesting past 254
+            # levels, both of which the stdlib fallback below can produce
+            return json.dumps(obj).encode()
+
+    def json_loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input the stdlib accepts (1e400, NaN,
+            # a UTF-8 BOM); the filters must see what imsg would see
+            return json.loads(data)
+else:
+    json_loads = json.loads
+
+    def json_dumpb(obj) -> bytes:
+        return json.dumps(obj).encode()
 
 # ── Contacts ────────────────────────────────────────────────────────────
 
 CONTACTS = {}           # alias -> real handle
 HANDLE_TO_ALIAS = {}    # normalized handle -> alias
-KNOWN_HANDLES = set()   # normalized handles for quick lookup
+
+# Service prefixes stripped by normalize_handle, in the order they're peeled
+_PREFIX_RE = re.compile(r"(?:imessage:)?(?:sms:)?(?:tel:)?")
+# str.translate table deleting every ASCII non-digit
+_ASCII_NON_DIGITS = str.maketrans("", "", "".join(
+    chr(c) for c in range(128) if not chr(c).isdigit()))
 
 
+@functools.lru_cache(maxsize=4096)
 def normalize_handle(handle: str) -> str:
+    # Fast path: already-normalized "+<digits>" (10 digits still get the
+    # country code prepended below)
+    if handle[:1] == "+" and handle[1:].isdigit() and len(handle) != 11:
+        return handle
     h = handle.strip().lower()
-    for prefix in ("imessage:", "sms:", "tel:"):
-        if h.startswith(prefix):
-            h = h[len(prefix):]
-    h = h.strip()
+    h = h[_PREFIX_RE.match(h).end():].strip()
     if h.startswith("+") or (h and h[0].isdigit()) or h.startswith("("):
-        digits = "".join(c for c in h if c.isdigit())
+        digits = h.translate(_ASCII_NON_DIGITS)
+        if digits and not digits.isdigit():
+            # Rare non-ASCII leftovers: fall back to the per-character filter
+            digits = "".join(c for c in digits if c.isdigit())
         if len(digits) == 10:
             digits = "1" + digits
         if digits:
@@ -59,7 +107,7 @@ def normalize_handle(handle: str) -> str:
 
 
 def load_contacts():
-    global CONTACTS, HANDLE_TO_ALIAS, KNOWN_HANDLES
+    global CONTACTS, HANDLE_TO_ALIAS
 
     raw = None
     contacts_file = os.environ.get("IMSG_CONTACTS_FILE", "")
@@ -87,6 +135,7 @@ def load_contacts():
         log("Set IMSG_CONTACTS_FILE or IMSG_CONTACTS env var")
         sys.exit(1)
 
+    normalize_handle.cache_clear()
     CONTACTS = {}
     HANDLE_TO_ALIAS = {}
     for alias, handle in raw.items():
@@ -94,9 +143,7 @@ def load_contacts():
         handle = handle.strip()
         if alias and handle:
             CONTACTS[alias] = handle
-            norm = normalize_handle(handle)
-            HANDLE_TO_ALIAS[norm] = alias
-            KNOWN_HANDLES.add(norm)
+            HANDLE_TO_ALIAS[normalize_handle(handle)] = alias
 
     if not CONTACTS:
         log("ERROR: Contacts file is empty")
@@ -106,24 +153,54 @@ def load_contacts():
 
 
 def is_known(handle: str) -> bool:
-    return normalize_handle(handle) in KNOWN_HANDLES
+    return normalize_handle(handle) in HANDLE_TO_ALIAS
 
 
 # ── Helpers ─────────────────────────────────────────────────────────────
 
 
+# strftime format -> (epoch second, formatted UTC timestamp)
+_TS_CACHE = {}
+
+
+def _timestamp(fmt: str) -> str:
+    """Current UTC time in `fmt`, re-formatted at most once per second."""
+    now = int(time.time())
+    cached = _TS_CACHE.get(fmt)
+    if cached is None or cached[0] != now:
+        cached = (now, datetime.fromtimestamp(now, timezone.utc).strftime(fmt))
+        _TS_CACHE[fmt] = cached
+    return cached[1]
+
+
 def log(msg: str):
-    ts = datetime.now(timezone.utc).strftime("%H:%M:%S")
+    ts = _timestamp("%H:%M:%S")
     print(f"[imsg-guard {ts}] {msg}", file=sys.stderr, flush=True)
 
 
+# Notification methods that carry messages and are filtered by sender
+NOTIFICATION_METHODS = frozenset({"message", "new_message", "message_received"})
+# Notification fields that may carry the sender's handle
+SENDER_KEYS = ("sender", "handle", "from", "address")
+
+
 def is_allowed_send(params: dict) -> bool:
     to = params.get("to", "")
-    if to and is_known(to):
-        return True
-    # Also accept aliases directly
-    if to and to.strip().lower() in CONTACTS:
-        return True
+    # Handles must be strings; anything else can't be checked, so refuse it
+    if not isinstance(to, str):
+        log("BLOCKED send: 'to' is not a string")
+        return False
+    for key in ("chat_id", "chat_guid", "chat_identifier"):
+        val = params.get(key)
+        if val is not None and not isinstance(val, str):
+            log(f"BLOCKED send: '{key}' is not a string")
+            return False
+    if to:
+        # Cheapest first: an exact alias, then a known handle in any
+        # spelling (is_known inlined), then a loosely typed alias
+        if (to in CONTACTS or normalize_handle(to) in HANDLE_TO_ALIAS
+                or to.strip().lower() in CONTACTS):
+            return True
     if params.get("chat_id") or params.get("chat_guid") or params.get("chat_identifier"):
         log("BLOCKED send: chat_id/chat_guid targets not allowed")
         return False
@@ -136,17 +213,23 @@ def is_allowed_send(params: dict) -> bool:
 
 def is_allowed_notification(params: dict) -> bool:
     msg = params.get("message", params)
-    if isinstance(msg, dict) and msg.get("is_from_me"):
-        return False
-    for obj in [msg, params] if isinstance(msg, dict) else [params]:
-        for key in ("sender", "handle", "from", "address"):
-            val = obj.get(key, "") if isinstance(obj, dict) else ""
-            if isinstance(val, str) and val.strip() and is_known(val.strip()):
-                return True
+    if isinstance(msg, dict):
+        if msg.get("is_from_me"):
+            return False
+        objs = (msg, params)
+    else:
+        objs = (params,)
+    for obj in objs:
+        for key in SENDER_KEYS:
+            val = obj.get(key)
+            if isinstance(val, str):
+                val = val.strip()
+                if val and is_known(val):
+                    return True
     # Try extracting sender for logging
     sender = ""
-    for key in ("sender", "handle", "from", "address"):
-        val = (msg if isinstance(msg, dict) else params).get(key, "")
+    for key in SENDER_KEYS:
+        val = objs[0].get(key)
         if isinstance(val, str) and val.strip():
             sender = val.strip()
             break
@@ -157,82 +240,235 @@ def is_allowed_notification(params: dict) -> bool:
 
 # ── JSON-RPC proxy ──────────────────────────────────────────────────────
 
+# fcntl command for resizing a pipe; Linux-only (Python exposes it on 3.10+)
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ",
+                        1031 if sys.platform.startswith("linux") else None)
+
+
+def grow_pipe(fd: int):
+    """Best-effort resize of a pipe's kernel buffer to PIPE_BUFFER_SIZE."""
+    if _F_SETPIPE_SZ is None:
+        return
+    try:
+        fcntl.fcntl(fd, _F_SETPIPE_SZ, PIPE_BUFFER_SIZE)
+    except OSError:
+        pass  # e.g. above /proc/sys/fs/pipe-max-size; the default still works
 
-def make_error_response(req_id, code: int, message: str) -> str:
-    return json.dumps({
+
+def take_lines(buf: bytearray, chunk: bytes) -> list:
+    """Append chunk to buf, then remove and return the complete lines in it.
+
+    Only the new chunk is searched for a newline, so a long line arriving
+    over many reads costs linear rather than quadratic time.
+    """
+    buf += chunk
+    if b"\n" not in chunk:
+        return []
+    end = buf.rindex(b"\n")
+    with memoryview(buf) as view:
+        lines = bytes(view[:end]).split(b"\n")
+    del buf[:end + 1]
+    return lines
+
+
+def make_error_response(req_id, code: int, message: str) -> bytes:
+    return json_dumpb({
         "jsonrpc": "2.0", "id": req_id,
         "error": {"code": code, "message": message}
     })
 
 
-def proxy_stdin_to_imsg(imsg_stdin):
+# Both directions move raw bytes: lines are parsed only to inspect them and
+# are forwarded verbatim, so there's no text decode/encode per line.
+
+# Lines are written straight to the fd: each is flushed immediately anyway,
+# so the BufferedWriter in between only added a copy and its lock
+_STDOUT_FD = sys.stdout.fileno()
+
+
+def write_line(line: bytes):
+    view = memoryview(line + b"\n")
+    while view:
+        view = view[os.write(_STDOUT_FD, view):]
+
+
+def filter_client_line(line: bytes):
+    """Filter one JSON-RPC line from the client.
+
+    Returns the line to forward to imsg, or None if it was dropped.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    # Only "send" is inspected; without JSON escapes that method can't be
+    # present unless its quoted name is, so everything else skips parsing
+    if b'"send"' not in line and b"\\" not in line:
+        return line
     try:
-        for line in sys.stdin:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                msg = json.loads(line)
-            except json.JSONDecodeError:
-                imsg_stdin.write(line + "\n")
-                imsg_stdin.flush()
-                continue
-
-            method = msg.get("method", "")
-            params = msg.get("params", {})
-            req_id = msg.get("id")
-
-            if method == "send":
-                if not is_allowed_send(params):
-                    if req_id is not None:
-                        err = make_error_response(
-                            req_id, -32001,
-                            "Blocked by imsg-guard: recipient not in contacts"
-                        )
-                        sys.stdout.write(err + "\n")
-                        sys.stdout.flush()
-                    continue
+        msg = json_loads(line)
+    except ValueError:  # JSONDecodeError or bad UTF-8
+        msg = None
+    if not isinstance(msg, dict):
+        # Might be a send we can't inspect (bad UTF-8, a batch array, ...):
+        # fail closed rather than forward it unchecked
+        log("BLOCKED request that could not be parsed as a JSON object")
+        write_line(make_error_response(
+            None, -32700, "Blocked by imsg-guard: request could not be parsed"))
+        return None
+
+    method = msg.get("method", "")
+    params = msg.get("params", {})
+    req_id = msg.get("id")
+
+    if method == "send":
+        if not isinstance(params, dict) or not is_allowed_send(params):
+            if req_id is not None:
+                err = make_error_response(
+                    req_id, -32001,
+                    "Blocked by imsg-guard: recipient not in contacts"
+                )
+                write_line(err)
+            return None
+
+    return line
+
+
+# Quoted method names of the notifications we filter. Without a backslash
+# (i.e. no JSON escapes) a line can only carry one of these methods if the
+# literal token appears in it, so lines lacking them can skip parsing.
+_FILTERED_METHOD_TOKENS = tuple(
+    b'"%s"' % m.encode() for m in sorted(NOTIFICATION_METHODS))
+
+
+def _may_be_filtered(line: bytes) -> bool:
+    if b"\\" in line:
+        return True
+    for token in _FILTERED_METHOD_TOKENS:
+        if token in line:
+            return True
+    return False
 
-            imsg_stdin.write(line + "\n")
-            imsg_stdin.flush()
-    except (BrokenPipeError, IOError):
-        pass
-    finally:
-        try:
-            imsg_stdin.close()
-        except Exception:
-            pass
 
+def handle_imsg_line(line: bytes):
+    """Filter one line from imsg and forward it to the client."""
+    line = line.strip()
+    if not line:
+        return
+    if not _may_be_filtered(line):
+        write_line(line)
+        return
+    try:
+        msg = json_loads(line)
+    except ValueError:  # JSONDecodeError or bad UTF-8
+        write_line(line)
+        return
 
-def proxy_imsg_to_stdout(imsg_stdout):
+    if msg.get("id") is not None:
+        write_line(line)
+        return
+
+    method = msg.get("method", "")
+    params = msg.get("params", {})
+
+    if isinstance(method, str) and method in NOTIFICATION_METHODS:
+        if not is_allowed_notification(params):
+            return
+
+    write_line(line)
+
+
+def _set_interest(sel, fd: int, events: int):
+    """Register, modify or unregister fd so the selector watches `events`."""
+    try:
+        key = sel.get_key(fd)
+    except KeyError:
+        if events:
+            sel.register(fd, events)
+        return
+    if not events:
+        sel.unregister(fd)
+    elif key.events != events:
+        sel.modify(fd, events)
+
+
+def run_proxy(proc):
+    """Shuttle lines between our stdio and imsg on a single thread.
+
+    Returns when imsg closes its stdout (or our stdout goes away).
+    """
+    client_fd = sys.stdin.fileno()
+    imsg_out_fd = proc.stdout.fileno()
+    imsg_in_fd = proc.stdin.fileno()
+    # imsg's stdin is written through a non-blocking backlog: blocking on it
+    # while imsg is itself blocked writing responses we aren't reading yet
+    # would deadlock the loop.
+    os.set_blocking(imsg_in_fd, False)
+    to_imsg = bytearray()
+    client_open = True
+    partial = {client_fd: bytearray(), imsg_out_fd: bytearray()}
+    sel = selectors.DefaultSelector()
+    sel.register(imsg_out_fd, selectors.EVENT_READ)
+    # epoll refuses regular files and /dev/null (stdin redirected from a
+    # file); those never block, so such a client is read unconditionally
     try:
-        for line in imsg_stdout:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                msg = json.loads(line)
-            except json.JSONDecodeError:
-                sys.stdout.write(line + "\n")
-                sys.stdout.flush()
-                continue
-
-            if msg.get("id") is not None:
-                sys.stdout.write(line + "\n")
-                sys.stdout.flush()
-                continue
-
-            method = msg.get("method", "")
-            params = msg.get("params", {})
-
-            if method in ("message", "new_message", "message_received"):
-                if not is_allowed_notification(params):
+        sel.register(client_fd, selectors.EVENT_READ)
+        sel.unregister(client_fd)
+        client_pollable = True
+    except PermissionError:
+        client_pollable = False
+
+    try:
+        while True:
+            # Read the client only while imsg keeps up; wait for imsg's
+            # stdin to drain only while there's something to send
+            want_client = client_open and len(to_imsg) < IMSG_BACKLOG_MAX
+            if client_pollable:
+                _set_interest(sel, client_fd, selectors.EVENT_READ if want_client else 0)
+            _set_interest(sel, imsg_in_fd, selectors.EVENT_WRITE if to_imsg else 0)
+
+            poll_client = want_client and not client_pollable
+            ready = [key.fd for key, _ in sel.select(0 if poll_client else None)]
+            if poll_client:
+                ready.append(client_fd)
+            for fd in ready:
+                if fd == imsg_in_fd:
+                    try:
+                        del to_imsg[:os.write(fd, to_imsg)]
+                    except BlockingIOError:
+                        pass
                     continue
 
-            sys.stdout.write(line + "\n")
-            sys.stdout.flush()
+                chunk = os.read(fd, READ_CHUNK_SIZE)
+                if chunk:
+                    lines = take_lines(partial[fd], chunk)
+                else:
+                    # EOF: flush any unterminated last line
+                    lines = [bytes(partial[fd])]
+                    partial[fd].clear()
+
+                if fd == client_fd:
+                    for line in lines:
+                        line = filter_client_line(line)
+                        if line is not None:
+                            to_imsg += line + b"\n"
+                    if not chunk:
+                        client_open = False
+                else:
+                    for line in lines:
+                        handle_imsg_line(line)
+                    if not chunk:
+                        return
+
+            if not client_open and not to_imsg and not proc.stdin.closed:
+                proc.stdin.close()  # let imsg see EOF too
     except (BrokenPipeError, IOError):
         pass
+    finally:
+        sel.close()
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
 
 
 # ── Main ────────────────────────────────────────────────────────────────
@@ -253,19 +489,16 @@ def main():
     try:
         proc = subprocess.Popen(
             args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-            stderr=sys.stderr, text=True, bufsize=1
+            stderr=sys.stderr
         )
     except FileNotFoundError:
         log(f"ERROR: imsg not found at {IMSG_PATH}")
         sys.exit(1)
+    grow_pipe(proc.stdin.fileno())
+    grow_pipe(proc.stdout.fileno())
 
     log(f"imsg rpc started (pid {proc.pid})")
 
-    stdin_thread = threading.Thread(target=proxy_stdin_to_imsg, args=(proc.stdin,), daemon=True)
-    stdout_thread = threading.Thread(target=proxy_imsg_to_stdout, args=(proc.stdout,), daemon=True)
-    stdin_thread.start()
-    stdout_thread.start()
-
     def shutdown(signum=None, frame=None):
         log("Shutting down...")
         try:
@@ -278,6 +511,7 @@ def main():
     signal.signal(signal.SIGINT, shutdown)
     signal.signal(signal.SIGTERM, shutdown)
 
+    run_proxy(proc)
     proc.wait()
     code = proc.returncode
     if code != 0:
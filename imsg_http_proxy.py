@@ -18,22 +18,34 @@ Environment variables:
     IMSG_BRIDGE_URL    Base URL of the iMessage bridge (required)
     IMSG_BRIDGE_TOKEN  Bearer token for bridge auth (required)
     IMSG_POLL_MS       Notification poll interval in ms (default: 500)
+    IMSG_POLL_WAIT     Long-poll hold time in seconds, 0 to disable (default: 25)
 """
 
+import http.client
 import json
 import os
+import random
 import signal
 import sys
 import threading
-import time
-import urllib.request
-import urllib.error
+import urllib.parse
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
 
 # ── Config ──────────────────────────────────────────────────────────────
 
 BRIDGE_URL = os.environ.get("IMSG_BRIDGE_URL", "").rstrip("/")
 BRIDGE_TOKEN = os.environ.get("IMSG_BRIDGE_TOKEN", "")
 POLL_INTERVAL = int(os.environ.get("IMSG_POLL_MS", "500")) / 1000.0
+# Seconds the bridge may hold an empty /notifications poll open
+POLL_WAIT = int(os.environ.get("IMSG_POLL_WAIT", "25"))
+# Longest pause between polls while the bridge keeps failing (seconds)
+POLL_BACKOFF_MAX = 30
+# Max bytes read from stdin per wake-up
+READ_CHUNK_SIZE = 65536
 
 if not BRIDGE_URL:
     print("ERROR: IMSG_BRIDGE_URL is required", file=sys.stderr)
@@ -42,6 +54,28 @@ if not BRIDGE_TOKEN:
     print("ERROR: IMSG_BRIDGE_TOKEN is required", file=sys.stderr)
     sys.exit(1)
 
+if orjson is not None:
+    def json_loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input the stdlib accepts (1e400, NaN,
+            # a UTF-8 BOM), and bridges may pass such lines through
+            return json.loads(data)
+
+    def json_dumpb(obj) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson can't encode ints beyond 64 bits or nesting past 254
+            # levels, both of which the stdlib fallback above can produce
+            return json.dumps(obj).encode()
+else:
+    json_loads = json.loads
+
+    def json_dumpb(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 
 # ── Helpers ─────────────────────────────────────────────────────────────
 
@@ -52,107 +86,193 @@ def log(msg: str):
     print(f"[imsg-proxy] {msg}", file=sys.stderr, flush=True)
 
 
-def write_stdout(line: str):
-    """Thread-safe write to stdout."""
+# Output goes straight to the fd; every write is flushed immediately
+# anyway, so the BufferedWriter in between only added a copy
+_STDOUT_FD = sys.stdout.fileno()
+
+
+def _write_all(data: bytes):
+    """Write data to stdout with os.write; caller holds stdout_lock."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(_STDOUT_FD, view):]
+
+
+def write_stdout(line: bytes):
+    """Thread-safe write of one line to stdout."""
     with stdout_lock:
-        sys.stdout.write(line + "\n")
-        sys.stdout.flush()
+        _write_all(line + b"\n")
 
 
-def http_post(path: str, data: dict, timeout: float = 20) -> dict:
-    """POST JSON to the bridge and return parsed response."""
-    url = f"{BRIDGE_URL}{path}"
-    body = json.dumps(data).encode()
-    req = urllib.request.Request(
-        url, data=body, method="POST",
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {BRIDGE_TOKEN}",
-        }
-    )
+# One keep-alive connection per thread (the poller and the stdin reader),
+# reconnected transparently by http.client after the bridge closes it
+_bridge = urllib.parse.urlsplit(BRIDGE_URL)
+_HTTPConnection = (http.client.HTTPSConnection if _bridge.scheme == "https"
+                   else http.client.HTTPConnection)
+_local = threading.local()
+
+
+def _connection(timeout: float) -> http.client.HTTPConnection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _HTTPConnection(_bridge.hostname, _bridge.port)
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+
+def http_request(method: str, path: str, body: bytes = None,
+                 timeout: float = 20) -> dict:
+    """Send a request to the bridge and return the parsed JSON response."""
+    headers = {"Authorization": f"Bearer {BRIDGE_TOKEN}"}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return json.loads(resp.read())
-    except urllib.error.HTTPError as e:
-        try:
-            err_body = json.loads(e.read())
-        except Exception:
-            err_body = {"error": f"HTTP {e.code}"}
-        return err_body
+        conn = _connection(timeout)
+        for attempt in range(2):
+            reused = conn.sock is not None
+            try:
+                conn.request(method, _bridge.path + path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except ConnectionError:
+                conn.close()
+                # A reused connection may have been closed by the bridge
+                # while idle, before it read our request: retry once fresh
+                if not reused or attempt:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+        if resp.status >= 400:
+            try:
+                return json_loads(data)
+            except Exception:
+                return {"error": f"HTTP {resp.status}"}
+        return json_loads(data)
     except Exception as e:
         return {"error": str(e)}
 
 
+def http_post(path: str, data: dict, timeout: float = 20) -> dict:
+    """POST JSON to the bridge and return parsed response."""
+    return http_request("POST", path, json_dumpb(data), timeout)
+
+
 def http_get(path: str, timeout: float = 10) -> dict:
     """GET from the bridge and return parsed response."""
-    url = f"{BRIDGE_URL}{path}"
-    req = urllib.request.Request(
-        url, method="GET",
-        headers={"Authorization": f"Bearer {BRIDGE_TOKEN}"}
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return json.loads(resp.read())
-    except urllib.error.HTTPError as e:
-        try:
-            err_body = json.loads(e.read())
-        except Exception:
-            err_body = {"error": f"HTTP {e.code}"}
-        return err_body
-    except Exception as e:
-        return {"error": str(e)}
+    return http_request("GET", path, timeout=timeout)
 
 
 # ── Notification poller ─────────────────────────────────────────────────
 
+def encode_notifications(notifications: list) -> bytes:
+    """Encode a /notifications batch as newline-terminated JSON lines."""
+    # Each notification is a JSON-RPC object; older bridges sent
+    # pre-serialized JSON strings, which must not be quoted again
+    buf = bytearray()
+    for n in notifications:
+        buf += n.encode() if isinstance(n, str) else json_dumpb(n)
+        buf += b"\n"
+    return bytes(buf)
+
+
 def poll_notifications(stop_event: threading.Event):
     """Poll the bridge for notifications and write them to stdout."""
     consecutive_errors = 0
+    # The bridge answers as soon as something is buffered, so a long-poll
+    # gets notifications without waiting out POLL_INTERVAL
+    path = f"/notifications?wait={POLL_WAIT}" if POLL_WAIT > 0 else "/notifications"
     while not stop_event.is_set():
+        notifications = None
         try:
-            result = http_get("/notifications", timeout=5)
+            result = http_get(path, timeout=POLL_WAIT + 5)
+            # http_get reports failures (bridge down, 401, ...) in the result
+            error = result.get("error")
             notifications = result.get("notifications", [])
-            for n in notifications:
-                # Each notification is a JSON string
-                if isinstance(n, str):
-                    write_stdout(n)
-                else:
-                    write_stdout(json.dumps(n))
-            consecutive_errors = 0
+            if notifications:
+                # The batch is written under one lock with a single flush
+                buf = encode_notifications(notifications)
+                with stdout_lock:
+                    _write_all(buf)
         except Exception as e:
+            error = e
+
+        if error:
             consecutive_errors += 1
             if consecutive_errors <= 3:
-                log(f"Poll error: {e}")
-            # Back off on repeated errors
-            if consecutive_errors > 5:
-                time.sleep(min(consecutive_errors * POLL_INTERVAL, 10))
-
-        stop_event.wait(POLL_INTERVAL)
+                log(f"Poll error: {error}")
+            # Capped exponential back-off, jittered so several proxies
+            # don't hit a recovering bridge in lockstep
+            ceiling = POLL_INTERVAL * 2 ** min(consecutive_errors, 16)
+            stop_event.wait(random.uniform(POLL_INTERVAL, min(ceiling, POLL_BACKOFF_MAX)))
+        else:
+            consecutive_errors = 0
+            # Poll again right away while notifications keep coming;
+            # otherwise pause (bridges without long-poll return immediately)
+            if not notifications:
+                stop_event.wait(POLL_INTERVAL)
 
 
 # ── Stdin reader (JSON-RPC requests) ───────────────────────────────────
 
-def process_stdin(stop_event: threading.Event):
-    """Read JSON-RPC from stdin, forward to bridge, write responses to stdout."""
+def handle_stdin_line(line: bytes):
+    """Forward one JSON-RPC line to the bridge and write the response."""
+    line = line.strip()
+    if not line:
+        return
+
     try:
-        for line in sys.stdin:
-            if stop_event.is_set():
-                break
-            line = line.strip()
-            if not line:
-                continue
+        msg = json_loads(line)
+    except ValueError:  # JSONDecodeError or bad UTF-8
+        return
+
+    # Forward to bridge
+    result = http_post("/rpc", msg)
+
+    # Write response to stdout (if it has content)
+    if result:
+        write_stdout(json_dumpb(result))
 
-            try:
-                msg = json.loads(line)
-            except json.JSONDecodeError:
-                continue
 
-            # Forward to bridge
-            result = http_post("/rpc", msg)
+def take_lines(buf: bytearray, chunk: bytes) -> list:
+    """Append chunk to buf, then remove and return the complete lines in it.
 
-            # Write response to stdout (if it has content)
-            if result:
-                write_stdout(json.dumps(result))
+    Only the new chunk is searched for a newline, so a long line arriving
+    over many reads costs linear rather than quadratic time.
+    """
+    buf += chunk
+    if b"\n" not in chunk:
+        return []
+    end = buf.rindex(b"\n")
+    with memoryview(buf) as view:
+        lines = bytes(view[:end]).split(b"\n")
+    del buf[:end + 1]
+    return lines
+
+
+def process_stdin(stop_event: threading.Event):
+    """Read JSON-RPC from stdin, forward to bridge, write responses to stdout."""
+    fd = sys.stdin.fileno()
+    partial = bytearray()
+    try:
+        while not stop_event.is_set():
+            # Read whatever is available and split it into lines in one go
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+            if chunk:
+                lines = take_lines(partial, chunk)
+            else:
+                # EOF: flush any unterminated last line
+                lines = [bytes(partial)]
+                partial.clear()
+            for line in lines:
+                if stop_event.is_set():
+                    break
+                handle_stdin_line(line)
+            if not chunk:
+                break
 
     except (BrokenPipeError, IOError):
         pass